@@ -13,6 +13,8 @@ Hardware validation is done locally via validate_pi.py.
 
 import os
 import ast
+import json
+import hashlib
 from pathlib import Path
 
 import pytest
@@ -179,7 +181,8 @@ def test_local_tests_executed():
     """
     Verify that local tests were run on the Raspberry Pi.
 
-    Expected: .test_markers/ directory with test results
+    Expected: .test_markers/manifest.json with test results, written
+    for the current version of your scripts
 
     Suggestion: On your Raspberry Pi, run:
         python3 validate_pi.py
@@ -201,7 +204,13 @@ def test_local_tests_executed():
             f"  git push\n"
         )
 
-    # Check for at least one marker file
+    manifest_path = markers_dir / "manifest.json"
+
+    if manifest_path.exists():
+        check_manifest(manifest_path)
+        return
+
+    # Marker files written by older versions of validate_pi.py
     marker_files = list(markers_dir.glob("*.txt"))
 
     if not marker_files:
@@ -213,3 +222,67 @@ def test_local_tests_executed():
             f"  python3 validate_pi.py\n"
             f"Make sure the script completes successfully.\n"
         )
+
+
+def check_manifest(manifest_path):
+    """Verify that the validation manifest is complete and not stale."""
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except ValueError as e:
+        pytest.fail(
+            f"\n\n"
+            f"Expected: A valid .test_markers/manifest.json\n"
+            f"Actual: Manifest could not be read ({e})\n\n"
+            f"Suggestion: Do not edit the manifest by hand. Run again:\n"
+            f"  python3 validate_pi.py\n"
+        )
+
+    if not isinstance(manifest, dict):
+        pytest.fail(
+            f"\n\n"
+            f"Expected: A JSON object in .test_markers/manifest.json\n"
+            f"Actual: Found a JSON {type(manifest).__name__}\n\n"
+            f"Suggestion: Do not edit the manifest by hand. Run again:\n"
+            f"  python3 validate_pi.py\n"
+        )
+
+    if not manifest.get("markers"):
+        pytest.fail(
+            f"\n\n"
+            f"Expected: At least one verified check in the manifest\n"
+            f"Actual: The manifest records no successful check\n\n"
+            f"Suggestion: Run local tests again:\n"
+            f"  python3 validate_pi.py\n"
+            f"Make sure the script completes successfully.\n"
+        )
+
+    files = manifest.get("files", {})
+    if not isinstance(files, dict):
+        pytest.fail(
+            f"\n\n"
+            f"Expected: Script hashes in .test_markers/manifest.json\n"
+            f"Actual: \"files\" is a JSON {type(files).__name__}\n\n"
+            f"Suggestion: Do not edit the manifest by hand. Run again:\n"
+            f"  python3 validate_pi.py\n"
+        )
+
+    # Scripts that existed at validation time must not have changed since
+    for name, recorded_hash in files.items():
+        if recorded_hash is None:
+            continue
+        script_path = REPO_ROOT / name
+        current_hash = (
+            hashlib.sha256(script_path.read_bytes()).hexdigest()
+            if script_path.exists() else None
+        )
+        if current_hash != recorded_hash:
+            pytest.fail(
+                f"\n\n"
+                f"Expected: Local tests executed on the current {name}\n"
+                f"Actual: {name} changed since validate_pi.py was run\n\n"
+                f"Suggestion: Run local tests again on your Raspberry Pi:\n"
+                f"  python3 validate_pi.py\n"
+                f"  git add .test_markers/\n"
+                f"  git commit -m \"feat: validation locale executee\"\n"
+                f"  git push\n"
+            )
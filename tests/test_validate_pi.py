@@ -0,0 +1,756 @@
+"""
+validate_pi.py: Offline Tests
+=============================
+
+These tests exercise the parts of validate_pi.py that do not need a
+Raspberry Pi: frame decoding, CRC-8 and retry logic are driven through
+small fake I2C devices and a fake clock.
+
+They are not part of the graded milestones.
+"""
+
+import os
+import sys
+import json
+import stat
+import random
+from pathlib import Path
+from datetime import timedelta, timezone
+
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# Helper: Get repository root
+# ---------------------------------------------------------------------------
+def get_repo_root():
+    """Find the repository root by looking for .github folder."""
+    current = Path(__file__).parent.parent
+    if (current / ".github").exists():
+        return current
+    return current
+
+
+REPO_ROOT = get_repo_root()
+sys.path.insert(0, str(REPO_ROOT))
+
+import validate_pi  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Helper: Fake AHT20
+# ---------------------------------------------------------------------------
+# Status 0x1C (calibrated, idle), ~23.7 C and ~42 %RH
+AHT20_PAYLOAD = bytes([0x1C, 0x6B, 0x85, 0x15, 0xE6, 0x2C])
+AHT20_GOOD_FRAME = AHT20_PAYLOAD + bytes([validate_pi.crc8_aht20(AHT20_PAYLOAD)])
+AHT20_BAD_CRC_FRAME = AHT20_PAYLOAD + bytes([AHT20_GOOD_FRAME[6] ^ 0xFF])
+AHT20_BUSY_FRAME = bytes([0x9C]) + AHT20_GOOD_FRAME[1:]
+
+
+class FakeI2CDevice:
+    """Stand-in for adafruit_bus_device's I2CDevice returning canned frames."""
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.writes = []
+        self.reads = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def write(self, buffer):
+        self.writes.append(bytes(buffer))
+
+    def readinto(self, buffer):
+        frame = self.frames[min(self.reads, len(self.frames) - 1)]
+        self.reads += 1
+        buffer[:] = frame
+
+
+class FakeSensor:
+    """Only the i2c_device attribute of adafruit_ahtx0.AHTx0 is used."""
+
+    def __init__(self, frames):
+        self.i2c_device = FakeI2CDevice(frames)
+
+
+@pytest.fixture(autouse=True)
+def fast_aht20_timing(monkeypatch):
+    """Keep busy polling short so the tests run in milliseconds."""
+    monkeypatch.setattr(validate_pi, "AHT20_POLL_INTERVAL", 0)
+    monkeypatch.setattr(validate_pi, "AHT20_BUSY_TIMEOUT", 0.005)
+    monkeypatch.setattr(validate_pi, "RECOVERY_HALF_PERIOD", 0)
+    monkeypatch.setattr(validate_pi, "BUS_ERRORS", 0)
+
+
+# ---------------------------------------------------------------------------
+# AHT20 CRC-8 and status byte
+# ---------------------------------------------------------------------------
+def test_crc8_check_value():
+    """CRC-8 (poly 0x31, init 0xFF) of "123456789" is 0xF7."""
+    assert validate_pi.crc8_aht20(b"123456789") == 0xF7
+
+
+def test_read_aht20_frame_good_frame():
+    """A frame with a valid CRC is decoded in a single conversion."""
+    sensor = FakeSensor([AHT20_GOOD_FRAME])
+
+    temperature, humidity, status, _ = validate_pi.read_aht20_frame(sensor)
+
+    assert temperature == pytest.approx(23.74, abs=0.01)
+    assert humidity == pytest.approx(42.0, abs=0.01)
+    assert status == 0x1C
+    assert sensor.i2c_device.writes == [validate_pi.AHT20_CMD_TRIGGER]
+
+
+def test_read_aht20_frame_rereads_bad_crc():
+    """A corrupted CRC is rejected and only the frame is read again."""
+    sensor = FakeSensor([AHT20_BAD_CRC_FRAME, AHT20_GOOD_FRAME])
+
+    temperature, _, _, _ = validate_pi.read_aht20_frame(sensor)
+
+    assert temperature == pytest.approx(23.74, abs=0.01)
+    assert sensor.i2c_device.reads == 2
+    assert len(sensor.i2c_device.writes) == 1  # no new conversion
+
+
+def test_read_aht20_frame_rejects_persistent_bad_crc():
+    """Bad data is never returned, even after every retry."""
+    sensor = FakeSensor([AHT20_BAD_CRC_FRAME])
+
+    with pytest.raises(RuntimeError):
+        validate_pi.read_aht20_frame(sensor)
+
+    assert len(sensor.i2c_device.writes) == validate_pi.AHT20_FRAME_RETRIES
+
+
+def test_read_aht20_frame_busy_sensor_raises():
+    """A sensor that never clears its busy bit is re-triggered, then fails."""
+    sensor = FakeSensor([AHT20_BUSY_FRAME])
+
+    with pytest.raises(RuntimeError):
+        validate_pi.read_aht20_frame(sensor)
+
+    assert len(sensor.i2c_device.writes) == validate_pi.AHT20_FRAME_RETRIES
+
+
+# ---------------------------------------------------------------------------
+# Timestamps
+# ---------------------------------------------------------------------------
+class FakeClock:
+    """Replaces the time module: every sleep() advances exactly 10 ms."""
+
+    STEP_NS = 10_000_000
+
+    def __init__(self):
+        self.now_ns = 1_000_000_000
+
+    def monotonic_ns(self):
+        return self.now_ns
+
+    def monotonic(self):
+        return self.now_ns / 1e9
+
+    def sleep(self, seconds):
+        self.now_ns += self.STEP_NS
+
+
+def test_read_aht20_frame_timestamp_is_conversion_midpoint(monkeypatch):
+    """The sample time lies halfway between the trigger and the ready poll."""
+    clock = FakeClock()
+    monkeypatch.setattr(validate_pi, "time", clock)
+    monkeypatch.setattr(validate_pi, "AHT20_BUSY_TIMEOUT", 1.0)
+    sensor = FakeSensor([AHT20_BUSY_FRAME, AHT20_BUSY_FRAME, AHT20_GOOD_FRAME])
+
+    triggered_ns = clock.now_ns
+    _, _, _, timestamp_ns = validate_pi.read_aht20_frame(sensor)
+    ready_ns = clock.now_ns  # three 10 ms polls later
+
+    assert triggered_ns <= timestamp_ns <= ready_ns
+    assert timestamp_ns == triggered_ns + (ready_ns - triggered_ns) // 2
+
+
+class SimulatedAHT20Device:
+    """
+    AHT20 on a simulated bus: conversions take 80 ms, and every transfer
+    costs a random 0-300 us of bus time on the shared fake clock.
+    """
+
+    CONVERSION_NS = 80_000_000
+
+    def __init__(self, clock, rng):
+        self.clock = clock
+        self.rng = rng
+        self.midpoints = []  # true conversion midpoints
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def _transfer(self):
+        self.clock.now_ns += self.rng.randrange(300_000)
+
+    def write(self, buffer):
+        self._transfer()
+        self.started_ns = self.clock.now_ns
+        self.midpoints.append(self.started_ns + self.CONVERSION_NS // 2)
+
+    def readinto(self, buffer):
+        self._transfer()
+        busy = self.clock.now_ns < self.started_ns + self.CONVERSION_NS
+        buffer[:] = AHT20_BUSY_FRAME if busy else AHT20_GOOD_FRAME
+
+
+class ExactClock(FakeClock):
+    """FakeClock whose sleep() advances by the requested time."""
+
+    def sleep(self, seconds):
+        self.now_ns += int(seconds * 1e9)
+
+
+def test_read_aht20_frame_timestamp_jitter_is_bounded(monkeypatch):
+    """
+    At a 10 Hz sample rate on the simulated bus, each timestamp is within
+    half a poll interval (plus one transfer) of the true conversion
+    midpoint, so intervals stay within one poll interval (+ 2 transfers)
+    of the true ones.
+    """
+    clock = ExactClock()
+    monkeypatch.setattr(validate_pi, "time", clock)
+    monkeypatch.setattr(validate_pi, "AHT20_POLL_INTERVAL", 0.002)
+    monkeypatch.setattr(validate_pi, "AHT20_BUSY_TIMEOUT", 1.0)
+    device = SimulatedAHT20Device(clock, random.Random(38))
+    sensor = FakeSensor([])
+    sensor.i2c_device = device
+
+    period_ns = 100_000_000
+    timestamps = []
+    for n in range(50):
+        clock.now_ns = max(clock.now_ns, 1_000_000_000 + n * period_ns)
+        timestamps.append(validate_pi.read_aht20_frame(sensor)[3])
+
+    poll_ns = 2_000_000
+    transfer_ns = 300_000
+    errors = [t - true for t, true in zip(timestamps, device.midpoints)]
+    assert max(abs(e) for e in errors) <= poll_ns // 2 + transfer_ns
+
+    intervals = [b - a for a, b in zip(timestamps, timestamps[1:])]
+    true_intervals = [b - a for a, b in zip(device.midpoints, device.midpoints[1:])]
+    spread = max(abs(i - t) for i, t in zip(intervals, true_intervals))
+    assert spread <= poll_ns + 2 * transfer_ns
+
+
+def test_to_wall_clock_uses_anchor():
+    """Monotonic timestamps convert to UTC through the start-up anchor."""
+    anchor = validate_pi.to_wall_clock(validate_pi.CLOCK_ANCHOR_MONOTONIC_NS)
+    later = validate_pi.to_wall_clock(
+        validate_pi.CLOCK_ANCHOR_MONOTONIC_NS + 1_500_000_000)
+
+    assert anchor.tzinfo == timezone.utc
+    assert anchor.timestamp() == pytest.approx(validate_pi.CLOCK_ANCHOR_WALL_NS / 1e9)
+    assert later - anchor == timedelta(seconds=1.5)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+class FakeBus:
+    """Minimal busio.I2C stand-in: devices answer a scan and nothing else."""
+
+    def __init__(self, addresses=()):
+        self.addresses = list(addresses)
+
+    def try_lock(self):
+        return True
+
+    def unlock(self):
+        pass
+
+    def deinit(self):
+        pass
+
+    def scan(self):
+        return list(self.addresses)
+
+
+def test_percentile_nearest_rank():
+    """p50 of 1..10 is 5, p95 is 10, a single value is its own percentile."""
+    values = list(range(1, 11))
+    assert validate_pi.percentile(values, 0.50) == 5
+    assert validate_pi.percentile(values, 0.95) == 10
+    assert validate_pi.percentile([7], 0.99) == 7
+
+
+@pytest.mark.parametrize("count", ["0", "-1", "abc"])
+def test_bench_requires_positive_count(count):
+    """--bench rejects anything below 1 instead of crashing or ignoring it."""
+    with pytest.raises(SystemExit):
+        validate_pi.parse_args(["--bench", count])
+
+
+def test_bench_reports_sensor_failure(monkeypatch):
+    """A sensor error during the benchmark fails cleanly, without a traceback."""
+    class BrokenAHTx0:
+        def __init__(self, i2c):
+            raise RuntimeError("Could not calibrate")
+
+    fake_module = type(sys)("adafruit_ahtx0")
+    fake_module.AHTx0 = BrokenAHTx0
+    monkeypatch.setitem(sys.modules, "adafruit_ahtx0", fake_module)
+
+    bus = FakeBus([validate_pi.AHT20_ADDRESS])
+    assert validate_pi.run_benchmark(bus, 10) == 1
+
+
+# ---------------------------------------------------------------------------
+# I2C Record / Replay
+# ---------------------------------------------------------------------------
+class SimulatedAHT20Bus(FakeBus):
+    """Bus with an AHT20 at 0x38 that always returns a valid frame."""
+
+    def __init__(self, read_error=None):
+        super().__init__([validate_pi.AHT20_ADDRESS])
+        self.read_error = read_error
+
+    def writeto(self, address, buffer, *, start=0, end=None):
+        pass
+
+    def readfrom_into(self, address, buffer, *, start=0, end=None):
+        if self.read_error is not None:
+            raise self.read_error
+        end = len(buffer) if end is None else end
+        buffer[start:end] = AHT20_GOOD_FRAME[:end - start]
+
+
+class BusDevice:
+    """Minimal adafruit_bus_device.I2CDevice: lock, then talk to one address."""
+
+    def __init__(self, i2c, address):
+        self.i2c = i2c
+        self.address = address
+
+    def __enter__(self):
+        self.i2c.try_lock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.i2c.unlock()
+        return False
+
+    def write(self, buffer):
+        self.i2c.writeto(self.address, buffer)
+
+    def readinto(self, buffer):
+        self.i2c.readfrom_into(self.address, buffer)
+
+
+@pytest.fixture
+def fake_ahtx0(monkeypatch):
+    """Install a fake adafruit_ahtx0 whose AHTx0 talks through BusDevice."""
+    class AHTx0:
+        def __init__(self, i2c):
+            self.i2c_device = BusDevice(i2c, validate_pi.AHT20_ADDRESS)
+
+    module = type(sys)("adafruit_ahtx0")
+    module.AHTx0 = AHTx0
+    monkeypatch.setitem(sys.modules, "adafruit_ahtx0", module)
+    monkeypatch.setattr(validate_pi, "MARKERS", {})
+
+
+def test_record_then_replay_check_aht20(tmp_path, fake_ahtx0):
+    """check_aht20() passes identically on the live bus and on its replay."""
+    trace = tmp_path / "aht20.i2c"
+
+    recorder = validate_pi.RecordingI2C(SimulatedAHT20Bus(), trace)
+    assert validate_pi.check_aht20(recorder) is True
+    recorder.close()
+
+    replay = validate_pi.ReplayI2C(trace)
+    assert validate_pi.check_aht20(replay) is True
+    assert replay.position == len(replay.records)  # whole trace consumed
+
+
+@pytest.mark.parametrize("error, replayed", [
+    (OSError(121, "Remote I/O error"), OSError),
+    (RuntimeError("bus driver failure"), RuntimeError),
+])
+def test_replay_raises_recorded_errors(tmp_path, error, replayed):
+    """A failed transaction is replayed as a failure, never as data."""
+    trace = tmp_path / "error.i2c"
+    recorder = validate_pi.RecordingI2C(SimulatedAHT20Bus(read_error=error), trace)
+    with pytest.raises(type(error)):
+        recorder.readfrom_into(validate_pi.AHT20_ADDRESS, bytearray(7))
+    recorder.close()
+
+    replay = validate_pi.ReplayI2C(trace)
+    with pytest.raises(replayed) as excinfo:
+        replay.readfrom_into(validate_pi.AHT20_ADDRESS, bytearray(7))
+    if isinstance(error, OSError):
+        assert excinfo.value.errno == error.errno
+
+
+def test_replay_mismatch_raises(tmp_path):
+    """A call that differs from the recorded one is reported, not guessed."""
+    trace = tmp_path / "write.i2c"
+    recorder = validate_pi.RecordingI2C(SimulatedAHT20Bus(), trace)
+    recorder.writeto(validate_pi.AHT20_ADDRESS, validate_pi.AHT20_CMD_TRIGGER)
+    recorder.close()
+
+    replay = validate_pi.ReplayI2C(trace)
+    with pytest.raises(RuntimeError, match="mismatch"):
+        replay.writeto(validate_pi.AHT20_ADDRESS, b"\xBA")
+
+
+class SlowScanBus(FakeBus):
+    """Bus whose scan takes 10 s (clock-stretch timeouts), then fails."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def scan(self):
+        self.clock.sleep(10.0)
+        raise OSError(110, "Connection timed out")
+
+
+def test_record_slow_call(tmp_path, monkeypatch):
+    """A call longer than 4.29 s is recorded; its bus error still surfaces."""
+    clock = ExactClock()
+    monkeypatch.setattr(validate_pi, "time", clock)
+    trace = tmp_path / "slow.i2c"
+
+    recorder = validate_pi.RecordingI2C(SlowScanBus(clock), trace)
+    assert validate_pi.scan_i2c(recorder) is None
+    recorder.close()
+
+    record = validate_pi.load_trace(trace)[0]
+    assert record[2] == 110
+    assert record[4] == 10_000_000_000
+
+
+def test_truncated_trace_is_reported(tmp_path, capsys):
+    """A damaged trace is reported as such, not as an I2C setup problem."""
+    trace = tmp_path / "truncated.i2c"
+    recorder = validate_pi.RecordingI2C(SimulatedAHT20Bus(), trace)
+    recorder.writeto(validate_pi.AHT20_ADDRESS, validate_pi.AHT20_CMD_TRIGGER)
+    recorder.close()
+    trace.write_bytes(trace.read_bytes()[:-2])
+
+    assert validate_pi.check_i2c(replay_path=trace) is None
+    output = capsys.readouterr().out
+    assert "truncated" in output
+    assert "raspi-config" not in output
+
+
+# ---------------------------------------------------------------------------
+# Validation Manifest
+# ---------------------------------------------------------------------------
+@pytest.fixture
+def markers_dir(tmp_path, monkeypatch):
+    """Write the manifest into a temporary .test_markers/ folder."""
+    directory = tmp_path / ".test_markers"
+    monkeypatch.setattr(validate_pi, "MARKERS_DIR", directory)
+    monkeypatch.setattr(validate_pi, "MANIFEST_PATH", directory / "manifest.json")
+    monkeypatch.setattr(validate_pi, "MARKERS", {})
+    return directory
+
+
+def test_manifest_mode_follows_umask(markers_dir):
+    """The manifest is not left 0600 by the temporary file it came from."""
+    old_umask = os.umask(0o022)
+    try:
+        validate_pi.write_manifest({})
+    finally:
+        os.umask(old_umask)
+
+    mode = stat.S_IMODE((markers_dir / "manifest.json").stat().st_mode)
+    assert mode == 0o644
+
+
+def test_failed_run_replaces_passing_manifest(markers_dir):
+    """A run with no passing check overwrites an older passing manifest."""
+    validate_pi.create_marker("aht20_verified", "T=21.0C H=40.0%RH")
+    validate_pi.write_manifest({"AHT20": {"passed": True, "duration_ms": 1.0}})
+
+    validate_pi.MARKERS.clear()
+    validate_pi.write_manifest({"AHT20": {"passed": False, "duration_ms": 1.0}})
+
+    manifest = json.loads((markers_dir / "manifest.json").read_text())
+    assert manifest["markers"] == {}
+    assert manifest["checks"]["AHT20"]["passed"] is False
+
+
+def test_check_manifest_rejects_non_object(tmp_path):
+    """Valid JSON that is not an object fails with a readable message."""
+    from tests.test_milestone_01 import check_manifest
+
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text("[]")
+
+    with pytest.raises(pytest.fail.Exception, match="JSON object"):
+        check_manifest(manifest_path)
+
+
+# ---------------------------------------------------------------------------
+# I2C Bus Clock
+# ---------------------------------------------------------------------------
+class ProbedBus(SimulatedAHT20Bus):
+    """Simulated AHT20 bus whose reads fail above a given clock."""
+
+    def __init__(self, frequency, max_frequency):
+        super().__init__()
+        self.frequency = frequency
+        if frequency is not None and frequency > max_frequency:
+            self.read_error = OSError(121, "Remote I/O error")
+
+
+@pytest.fixture
+def no_kernel_clock(tmp_path, monkeypatch):
+    """Pretend the platform honours the requested frequency."""
+    monkeypatch.setattr(validate_pi, "I2C_CLOCK_SYSFS", tmp_path / "missing")
+
+
+def test_empty_kernel_clock_file_is_unknown(tmp_path, monkeypatch):
+    """An empty sysfs clock file means "unknown", not a 0 kHz bus."""
+    clock_file = tmp_path / "clock-frequency"
+    clock_file.write_bytes(b"")
+    monkeypatch.setattr(validate_pi, "I2C_CLOCK_SYSFS", clock_file)
+    assert validate_pi.read_kernel_i2c_clock() is None
+
+    clock_file.write_bytes((400_000).to_bytes(4, "big"))
+    assert validate_pi.read_kernel_i2c_clock() == 400_000
+
+
+def test_tune_steps_up_and_keeps_frequency(monkeypatch, no_kernel_clock):
+    """Auto-tune returns the fastest clean frequency for later re-creation."""
+    monkeypatch.setattr(validate_pi, "create_i2c",
+                        lambda frequency=None: ProbedBus(frequency, 400_000))
+
+    i2c, frequency = validate_pi.tune_i2c_frequency()
+
+    assert frequency == 400_000
+    assert i2c.frequency == 400_000
+
+
+def test_tune_falls_back_on_errors(monkeypatch, no_kernel_clock):
+    """Errors at 400 kHz fall back to 100 kHz."""
+    monkeypatch.setattr(validate_pi, "create_i2c",
+                        lambda frequency=None: ProbedBus(frequency, 100_000))
+
+    _, frequency = validate_pi.tune_i2c_frequency()
+
+    assert frequency == 100_000
+
+
+def test_tune_does_not_pass_a_failing_bus(monkeypatch, no_kernel_clock, capsys):
+    """If even 100 kHz fails the probe, no [PASS] is printed for the clock."""
+    monkeypatch.setattr(validate_pi, "create_i2c", lambda frequency=None: FakeBus())
+
+    validate_pi.tune_i2c_frequency()
+
+    output = capsys.readouterr().out
+    assert "[PASS]" not in output
+    assert "Probe failed" in output
+
+
+# ---------------------------------------------------------------------------
+# Bus Recovery
+# ---------------------------------------------------------------------------
+class StuckSensorPins:
+    """
+    Fake pin driver wired to a sensor that holds SDA low until it has seen
+    `clocks_needed` SCL pulses (None: holds it forever).
+    """
+
+    def __init__(self, clocks_needed=None):
+        self.clocks_needed = clocks_needed
+        self.pulses = 0
+        self.low = set()
+        self.events = []
+        self.restored = False
+
+    @property
+    def stuck(self):
+        return self.clocks_needed is None or self.pulses < self.clocks_needed
+
+    def read(self, pin):
+        if pin == validate_pi.SDA_PIN and self.stuck:
+            return False
+        return pin not in self.low
+
+    def drive_low(self, pin):
+        self.events.append(("low", pin))
+        self.low.add(pin)
+        self.restored = False
+
+    def release(self, pin):
+        self.events.append(("release", pin))
+        if pin == validate_pi.SCL_PIN and pin in self.low:
+            self.pulses += 1
+        self.low.discard(pin)
+
+    def restore_i2c(self):
+        self.restored = True
+
+
+class StuckAHT20Bus(SimulatedAHT20Bus):
+    """
+    AHT20 bus while the pins say SDA is stuck low. As on the Pi controller,
+    every address then ACKs and reads return zeros; with timeouts=True,
+    every transfer times out instead.
+    """
+
+    def __init__(self, pins, timeouts=False):
+        super().__init__()
+        self.pins = pins
+        self.timeouts = timeouts
+
+    def _check_stuck(self):
+        if self.pins.stuck and self.timeouts:
+            raise OSError(110, "Connection timed out")
+        return self.pins.stuck
+
+    def scan(self):
+        if self._check_stuck():
+            return list(range(0x80))
+        return super().scan()
+
+    def writeto(self, address, buffer, *, start=0, end=None):
+        self._check_stuck()
+
+    def readfrom_into(self, address, buffer, *, start=0, end=None):
+        if self._check_stuck():
+            end = len(buffer) if end is None else end
+            buffer[start:end] = bytes(end - start)
+            return
+        super().readfrom_into(address, buffer, start=start, end=end)
+
+
+@pytest.fixture
+def pins(monkeypatch):
+    """Install a StuckSensorPins driver that frees SDA after 3 clocks."""
+    driver = StuckSensorPins(clocks_needed=3)
+    monkeypatch.setattr(validate_pi, "find_pin_driver", lambda: driver)
+    return driver
+
+
+def test_clock_out_bus_sends_clocks_then_stop(pins):
+    """SCL pulses until SDA is released, then a STOP, then pins back to I2C."""
+    assert validate_pi.clock_out_bus(pins) is True
+
+    assert pins.pulses == 3 + 1  # the STOP starts with SCL high again
+    scl, sda = validate_pi.SCL_PIN, validate_pi.SDA_PIN
+    assert pins.events[-4:] == [("low", scl), ("low", sda), ("release", scl), ("release", sda)]
+    assert pins.restored
+
+
+def test_clock_out_bus_gives_up_after_nine_clocks():
+    """A sensor that never lets go gets 9 clocks and the pins are still restored."""
+    pins = StuckSensorPins(clocks_needed=None)
+
+    assert validate_pi.clock_out_bus(pins) is False
+
+    assert pins.pulses == validate_pi.RECOVERY_CLOCKS + 1
+    assert pins.restored
+
+
+def test_scan_with_reserved_addresses_is_a_stuck_bus():
+    """An ACK at every address (SDA held low) is not a list of devices."""
+    assert validate_pi.scan_i2c(FakeBus(range(0x80))) is None
+    assert validate_pi.BUS_ERRORS >= validate_pi.BUS_ERROR_LIMIT
+
+
+def test_empty_bus_is_not_recovered(pins, monkeypatch, capsys):
+    """No device on a healthy bus: SDA is high, the pins are left alone."""
+    pins.clocks_needed = 0
+    monkeypatch.setattr(validate_pi, "create_i2c", lambda frequency=None: FakeBus())
+
+    validate_pi.check_i2c()
+
+    assert pins.events == []
+    output = capsys.readouterr().out
+    assert "stuck" not in output
+    assert "No device answered" in output
+
+
+def test_stuck_bus_is_recovered_at_startup(pins, monkeypatch, capsys):
+    """A bus held low at start-up is clocked out, re-created and re-scanned."""
+    created = []
+
+    def create_i2c(frequency=None):
+        created.append(frequency)
+        return StuckAHT20Bus(pins)
+
+    monkeypatch.setattr(validate_pi, "create_i2c", create_i2c)
+
+    validate_pi.check_i2c(frequency=100_000)
+
+    assert not pins.stuck and pins.restored
+    assert created == [100_000, 100_000]  # re-created at the same clock
+    assert "Devices found: 0x38" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("timeouts", [False, True])
+def test_failed_check_recovers_and_reruns(pins, fake_ahtx0, monkeypatch, timeouts):
+    """Zero frames or timeouts in check_aht20() trigger a recovery, then it passes."""
+    bus = StuckAHT20Bus(pins, timeouts)
+    monkeypatch.setattr(validate_pi, "create_i2c", lambda frequency=None: bus)
+
+    result, _, i2c = validate_pi.run_sensor_check(validate_pi.check_aht20, bus)
+
+    assert result is True
+    assert i2c is bus
+    assert not pins.stuck
+
+
+def test_recovery_outcome_is_replayed(pins, fake_ahtx0, monkeypatch, tmp_path):
+    """A recording that went through a recovery replays without the pins."""
+    monkeypatch.setattr(validate_pi, "create_i2c",
+                        lambda frequency=None: StuckAHT20Bus(pins))
+    trace = tmp_path / "recovery.i2c"
+
+    recorder = validate_pi.RecordingI2C(StuckAHT20Bus(pins), trace)
+    assert validate_pi.run_sensor_check(validate_pi.check_aht20, recorder)[0] is True
+    recorder.close()
+
+    monkeypatch.setattr(validate_pi, "find_pin_driver", lambda: None)
+    replay = validate_pi.ReplayI2C(trace)
+    assert validate_pi.run_sensor_check(validate_pi.check_aht20, replay)[0] is True
+    assert replay.position == len(replay.records)
+
+
+def test_tune_falls_back_when_bus_cannot_open(monkeypatch, no_kernel_clock):
+    """A backend refusing 400 kHz keeps the 100 kHz bus, one bus open at a time."""
+    open_buses = []
+
+    class TrackedBus(ProbedBus):
+        def deinit(self):
+            open_buses.remove(self)
+
+    def create_i2c(frequency=None):
+        if open_buses:
+            raise RuntimeError("pins already in use")
+        if frequency == 400_000:
+            raise ValueError("unsupported frequency")
+        bus = TrackedBus(frequency, 400_000)
+        open_buses.append(bus)
+        return bus
+
+    monkeypatch.setattr(validate_pi, "create_i2c", create_i2c)
+
+    i2c, frequency = validate_pi.tune_i2c_frequency()
+
+    assert frequency == 100_000
+    assert open_buses == [i2c]
+
+
+@pytest.mark.parametrize("value", ["0", "-400000"])
+def test_i2c_frequency_must_be_positive(value):
+    """--i2c-frequency rejects zero and negative clocks."""
+    with pytest.raises(SystemExit):
+        validate_pi.parse_args(["--i2c-frequency", value])